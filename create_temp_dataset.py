@@ -3,33 +3,119 @@
 """
 Script to create a temporary dataset with a single problem, enhanced with error and code
 Usage: python create_temp_dataset.py <problem_id> [work_dir] [output_file]
+       python create_temp_dataset.py --batch-file <ids_file> [work_dir] [output_file]
 Example: python create_temp_dataset.py cvdp_copilot_64b66b_decoder_0001 work_testing_2
 """
 
 import sys
 import json
 import os
+import re
+import mmap
 from pathlib import Path
 import argparse
+import orjson
 
 
-def find_problem_in_dataset(dataset_file, problem_id):
-    """Find a specific problem in the dataset JSONL file."""
+DATASET_FILE = "dataset/cvdp_v1.0.2_nonagentic_code_generation_no_commercial.jsonl"
+DEFAULT_WORK_DIR = "work_testing_2"
+DEFAULT_OUTPUT_FILE = "dataset/temp_dataset.jsonl"
+
+# Sections appended to the original prompt by enhance_prompt
+ERRORS_HEADER = "\n\n---\n\n## Previous Iteration Errors\n\n### Runtime Errors:\n```\n"
+CODE_HEADER = "---\n\n## Previous Generated Code (with errors):\n\n```systemverilog\n"
+BLOCK_FOOTER = "\n```\n\n"
+FIX_REQUEST = "Please fix the errors in the code above.\n"
+
+
+# Matches the "id" field of a raw JSONL record without decoding the whole line
+ID_RE = re.compile(rb'"id"\s*:\s*"([^"]+)"')
+
+
+def build_or_load_index(dataset_file, rebuild=False):
+    """Return a {problem_id: byte_offset} index for the dataset JSONL file.
+
+    The index is cached next to the dataset as a JSON '.idx' sidecar and rebuilt
+    whenever the dataset's modification time or size changes, or when rebuild
+    is set.
+    """
+    index_file = dataset_file + '.idx'
+    st = os.stat(dataset_file)
+    key = [st.st_mtime_ns, st.st_size]
+    
+    if not rebuild:
+        try:
+            with open(index_file, 'rb') as f:
+                cached = orjson.loads(f.read())
+            if cached['key'] == key and isinstance(cached['offsets'], dict):
+                return cached['offsets']
+        except (OSError, orjson.JSONDecodeError, TypeError, KeyError):
+            pass
+    
+    offsets = {}
+    with open(dataset_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                while pos < size:
+                    end = mm.find(b'\n', pos)
+                    if end == -1:
+                        end = size
+                    match = ID_RE.search(mm, pos, end)
+                    if match:
+                        offsets.setdefault(match.group(1).decode(), pos)
+                    pos = end + 1
+    
+    # Write to a temporary file first so concurrent runs never see a partial index
+    temp_index_file = f"{index_file}.{os.getpid()}.tmp"
+    try:
+        with open(temp_index_file, 'wb') as f:
+            f.write(orjson.dumps({'key': key, 'offsets': offsets}))
+        os.replace(temp_index_file, index_file)
+    except OSError as e:
+        print(f"Warning: Could not write dataset index {index_file}: {e}")
+    
+    return offsets
+
+
+def _read_record(dataset_file, offset, problem_id):
+    """Decode the record at a byte offset, or return None if it is not problem_id."""
+    with open(dataset_file, 'rb') as f:
+        f.seek(offset)
+        try:
+            data = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+    if isinstance(data, dict) and data.get('id') == problem_id:
+        return data
+    return None
+
+
+def find_problem_in_dataset(dataset_file, problem_id, index=None):
+    """Find a specific problem in the dataset JSONL file, or return None if absent."""
     if not os.path.exists(dataset_file):
         print(f"Error: Dataset file not found at {dataset_file}")
         sys.exit(1)
     
-    with open(dataset_file, 'r') as f:
-        for line in f:
-            try:
-                data = json.loads(line.strip())
-                if data.get('id') == problem_id:
-                    return data
-            except json.JSONDecodeError:
-                continue
+    if index is None:
+        index = build_or_load_index(dataset_file)
+    
+    if problem_id in index:
+        data = _read_record(dataset_file, index[problem_id], problem_id)
+        if data is None:
+            # The offset points at another record, so the dataset changed
+            # without its mtime or size changing; rebuild once and retry.
+            # The caller's index is updated in place so later lookups reuse it.
+            index.clear()
+            index.update(build_or_load_index(dataset_file, rebuild=True))
+            if problem_id in index:
+                data = _read_record(dataset_file, index[problem_id], problem_id)
+        if data is not None:
+            return data
     
     print(f"Error: Problem ID '{problem_id}' not found in dataset")
-    sys.exit(1)
+    return None
 
 
 def extract_module_name(problem_data):
@@ -71,86 +157,72 @@ def read_file_safe(filepath):
 
 def find_error_file(error_dir):
     """Find the first .txt file in the error directory."""
-    if not os.path.exists(error_dir):
-        return None
-    
-    error_dir_path = Path(error_dir)
-    txt_files = list(error_dir_path.glob("*.txt"))
-    
-    if txt_files:
-        return str(txt_files[0])
-    return None
+    # glob() is lazy and yields nothing for a missing directory, so stop at the first hit
+    first_txt = next(Path(error_dir).glob("*.txt"), None)
+    return str(first_txt) if first_txt else None
 
 
 def get_latest_iteration(work_dir, problem_name):
     """Get the latest iteration number for a problem by scanning harness directory."""
     harness_dir = os.path.join(work_dir, problem_name, "harness")
     
-    if not os.path.exists(harness_dir):
+    try:
+        entries = os.scandir(harness_dir)
+    except FileNotFoundError:
         print(f"Warning: Harness directory not found at {harness_dir}")
         return None
     
-    # Get all numeric directory names
-    iterations = []
-    for item in os.listdir(harness_dir):
-        item_path = os.path.join(harness_dir, item)
-        if os.path.isdir(item_path) and item.isdigit():
-            iterations.append(int(item))
+    # Track the highest numeric directory name in a single pass
+    latest = None
+    with entries:
+        for entry in entries:
+            if entry.name.isdigit() and entry.is_dir(follow_symlinks=False):
+                iteration = int(entry.name)
+                if latest is None or iteration > latest:
+                    latest = iteration
     
-    if not iterations:
+    if latest is None:
         print(f"Warning: No iteration directories found in {harness_dir}")
         return None
     
-    # Return the highest iteration number
-    latest = max(iterations)
-    print(f"Auto-detected iteration: {latest} (found iterations: {sorted(iterations)})")
+    print(f"Auto-detected iteration: {latest}")
     return str(latest)
 
 
-def enhance_prompt(original_prompt, error_content, sim_log_content, code_content):
+def enhance_prompt(original_prompt, error_content, code_content):
     """Enhance the prompt with error information and previous code."""
-    enhanced_prompt = original_prompt
+    parts = [original_prompt]
     
     if error_content:
-        enhanced_prompt += "\n\n---\n\n## Previous Iteration Errors\n\n"
-        enhanced_prompt += "### Runtime Errors:\n```\n"
-        enhanced_prompt += error_content.strip()
-        enhanced_prompt += "\n```\n\n"
+        parts.append(ERRORS_HEADER)
+        parts.append(error_content.strip())
+        parts.append(BLOCK_FOOTER)
     
     if code_content:
-        enhanced_prompt += "---\n\n## Previous Generated Code (with errors):\n\n```systemverilog\n"
-        enhanced_prompt += code_content.strip()
-        enhanced_prompt += "\n```\n\n"
-        enhanced_prompt += "Please fix the errors in the code above.\n"
+        parts.append(CODE_HEADER)
+        parts.append(code_content.strip())
+        parts.append(BLOCK_FOOTER)
+        parts.append(FIX_REQUEST)
     
-    return enhanced_prompt
+    return ''.join(parts)
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description='Create a temporary dataset with enhanced prompt including errors and code'
-    )
-    parser.add_argument('problem_id', help='Problem ID to extract')
-    parser.add_argument('work_dir', nargs='?', default='work_testing_2', 
-                        help='Work directory (default: work_testing_2)')
-    parser.add_argument('output_file', nargs='?', default='dataset/temp_dataset.jsonl',
-                        help='Output file path (default: dataset/temp_dataset.jsonl)')
-    
-    args = parser.parse_args()
-    
-    # Configuration
-    problem_id = args.problem_id
-    work_dir = args.work_dir
-    output_file = args.output_file
-    dataset_file = "dataset/cvdp_v1.0.2_nonagentic_code_generation_no_commercial.jsonl"
-    
+def process_one(problem_id, work_dir, open_output, index):
+    """Build the enhanced dataset entry for one problem and append it to the output.
+
+    open_output() returns the output file handle; it is only called once an entry
+    is ready, so a run without any entry never creates the file.
+
+    Returns True on success, False if the problem could not be processed.
+    """
     print(f"Processing problem: {problem_id}")
     print(f"Work directory: {work_dir}")
-    print(f"Output file: {output_file}")
     print()
     
     # Find problem in dataset
-    problem_data = find_problem_in_dataset(dataset_file, problem_id)
+    problem_data = find_problem_in_dataset(DATASET_FILE, problem_id, index)
+    if problem_data is None:
+        return False
     
     # Extract problem_name (remove last 5 characters: _0001, _0006, etc.)
     problem_name = problem_id[:-5] if len(problem_id) > 5 else problem_id
@@ -159,7 +231,7 @@ def main():
     iteration = get_latest_iteration(work_dir, problem_name)
     if not iteration:
         print("Error: Could not find any iteration directories")
-        sys.exit(1)
+        return False
     
     # Extract module name
     module_name = extract_module_name(problem_data)
@@ -189,11 +261,9 @@ def main():
     else:
         print(f"Warning: No error file found in {error_dir}")
     
-    # Read sim.log
-    sim_log_content = ""
+    # Report sim.log presence (its content is not part of the prompt)
     if os.path.exists(sim_log_path):
         print(f"Found sim.log: {sim_log_path}")
-        sim_log_content = read_file_safe(sim_log_path)
     else:
         print(f"Warning: sim.log not found at {sim_log_path}")
     
@@ -209,23 +279,17 @@ def main():
     original_prompt = problem_data.get('input', {}).get('prompt', '')
     
     # Enhance the prompt
-    enhanced_prompt = enhance_prompt(original_prompt, error_content, sim_log_content, code_content)
+    enhanced_prompt = enhance_prompt(original_prompt, error_content, code_content)
     
     # Update the problem data
     problem_data['input']['prompt'] = enhanced_prompt
     
-    # Create output directory if needed
-    output_dir = os.path.dirname(output_file)
-    if output_dir and not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
     # Append to output file in JSONL format (one JSON object per line)
-    with open(output_file, 'a') as f:
-        json.dump(problem_data, f)
-        f.write('\n')  # JSONL requires newline after each entry
+    out_fh = open_output()
+    out_fh.write(orjson.dumps(problem_data) + b'\n')
     
     print(f"\n✓ Successfully appended to dataset!")
-    print(f"  File location: {os.path.abspath(output_file)}")
+    print(f"  File location: {os.path.abspath(out_fh.name)}")
     
     # Show preview
     print("\nEnhanced prompt preview:")
@@ -233,6 +297,100 @@ def main():
     preview = enhanced_prompt[:1000] + "..." if len(enhanced_prompt) > 1000 else enhanced_prompt
     print(preview)
     print("=" * 80)
+    
+    return True
+
+
+def read_batch_file(batch_file, default_work_dir):
+    """Read (problem_id, work_dir) pairs from a batch file.
+
+    Each non-empty line holds a problem ID optionally followed by its work directory.
+    """
+    jobs = []
+    with open(batch_file, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            work_dir = fields[1] if len(fields) > 1 else default_work_dir
+            jobs.append((fields[0], work_dir))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Create a temporary dataset with enhanced prompt including errors and code'
+    )
+    parser.add_argument('problem_id', nargs='?',
+                        help='Problem ID to extract (omit when using --batch-file)')
+    parser.add_argument('work_dir', nargs='?',
+                        help=f'Work directory (default: {DEFAULT_WORK_DIR})')
+    parser.add_argument('output_file', nargs='?',
+                        help=f'Output file path (default: {DEFAULT_OUTPUT_FILE})')
+    parser.add_argument('-b', '--batch-file',
+                        help='File listing problem IDs (one per line, optionally followed by a work '
+                             'directory) to append in a single run')
+    
+    args = parser.parse_args()
+    
+    # Without a problem ID the remaining positionals shift left in batch mode
+    positionals = [a for a in (args.problem_id, args.work_dir, args.output_file) if a is not None]
+    if args.batch_file:
+        if len(positionals) > 2:
+            parser.error('problem_id cannot be combined with --batch-file')
+        positionals.insert(0, None)
+    elif not positionals:
+        parser.error('problem_id is required unless --batch-file is given')
+    positionals += [None] * (3 - len(positionals))
+    
+    # Configuration
+    problem_id = positionals[0]
+    work_dir = positionals[1] or DEFAULT_WORK_DIR
+    output_file = positionals[2] or DEFAULT_OUTPUT_FILE
+    
+    if args.batch_file:
+        jobs = read_batch_file(args.batch_file, work_dir)
+    else:
+        jobs = [(problem_id, work_dir)]
+    
+    print(f"Output file: {output_file}")
+    print()
+    
+    # Build (or load) the dataset index once for every lookup in this run
+    if not os.path.exists(DATASET_FILE):
+        print(f"Error: Dataset file not found at {DATASET_FILE}")
+        sys.exit(1)
+    index = build_or_load_index(DATASET_FILE)
+    
+    # Open the output on the first entry only, then keep it open and let the
+    # large buffer absorb every appended entry
+    out_fhs = []
+    
+    def open_output():
+        if not out_fhs:
+            # Create output directory if needed
+            output_dir = os.path.dirname(output_file)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            out_fhs.append(open(output_file, 'ab', buffering=1 << 20))
+        return out_fhs[0]
+    
+    failed = []
+    try:
+        for job_problem_id, job_work_dir in jobs:
+            if not process_one(job_problem_id, job_work_dir, open_output, index):
+                failed.append(job_problem_id)
+    finally:
+        for out_fh in out_fhs:
+            out_fh.close()
+    
+    if args.batch_file:
+        print(f"\nAppended {len(jobs) - len(failed)}/{len(jobs)} problems")
+        for failed_id in failed:
+            print(f"  ✗ {failed_id}")
+    
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -7,12 +7,18 @@ Custom model instance that calls a localhost server.
 
 import os
 import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
 from src.model_helpers import ModelHelpers
 
 logging.basicConfig(level=logging.INFO)
 
+# Separator between the system prompt and the user prompt in prompt logs
+PROMPT_LOG_SEPARATOR = "\n\n----------------------------------------\n"
+
 class Localhost_Instance:
     """
     Model instance that makes calls to a local server.
@@ -32,6 +38,15 @@ class Localhost_Instance:
         self.debug = False
         self.server_url = "http://localhost:8000/generate"
         
+        # Reuse one keep-alive connection pool for every prompt, retrying
+        # briefly when the server refuses a connection. A POST that was sent is
+        # never retried, so a slow or hung generation is not submitted again
+        # and its read timeout surfaces as requests.exceptions.Timeout.
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.2)
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=16, max_retries=retries))
+        self.session.headers.update({"Content-Type": "application/json"})
+        
         logging.info(f"Created Localhost Model. Using model: {self.model}")
     
     def set_debug(self, debug: bool = True) -> None:
@@ -95,8 +110,11 @@ class Localhost_Instance:
                 
                 # Write to a temporary file first
                 temp_log = f"{prompt_log}.tmp"
-                with open(temp_log, "w+") as f:
-                    f.write(system_prompt + "\n\n----------------------------------------\n" + prompt)
+                with open(temp_log, "w") as f:
+                    # Write the pieces in turn rather than building one large string
+                    f.write(system_prompt)
+                    f.write(PROMPT_LOG_SEPARATOR)
+                    f.write(prompt)
                 
                 # Atomic rename to final file
                 os.replace(temp_log, prompt_log)
@@ -106,21 +124,21 @@ class Localhost_Instance:
                 raise
         
         try:
-            # Make POST request to localhost server (no timeout)
-            response = requests.post(
+            # Make POST request to localhost server
+            response = self.session.post(
                 self.server_url,
-                json={
+                data=orjson.dumps({
                     "prompt": prompt,
                     "model": self.model
-                },
-                headers={"Content-Type": "application/json"}
+                }),
+                timeout=timeout
             )
             
             # Check if request was successful
             response.raise_for_status()
             
             # Parse JSON response and extract the "response" field
-            response_data = response.json()
+            response_data = orjson.loads(response.content)
             result = response_data.get("response", "")
             
             if self.debug:
@@ -129,6 +147,10 @@ class Localhost_Instance:
             # Use ModelHelpers to parse the response (already created above)
             return helper.parse_model_response(result, files, expected_single_file)
             
+        except requests.exceptions.Timeout as e:
+            error_msg = f"Localhost server did not respond within {timeout}s: {str(e)}"
+            logging.error(error_msg)
+            raise ValueError(error_msg)
         except requests.exceptions.RequestException as e:
             error_msg = f"Unable to get response from localhost server: {str(e)}"
             logging.error(error_msg)
@@ -4,14 +4,16 @@ Script to filter dataset by specific problem IDs
 Usage: python filter_dataset.py
 """
 
-import json
 import argparse
+import orjson
 
 def filter_dataset(input_file, output_file, problem_ids):
     """Filter dataset to include only specified problem IDs."""
     
     # Convert list to set for faster lookup
     target_ids = set(problem_ids)
+    # Raw byte forms used as a cheap substring pre-filter before decoding
+    target_ids_bytes = [tid.encode() for tid in target_ids]
     
     found_count = 0
     found_ids = set()
@@ -20,19 +22,28 @@ def filter_dataset(input_file, output_file, problem_ids):
     print(f"Writing to: {output_file}")
     print(f"Looking for {len(target_ids)} problem IDs...\n")
     
-    with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
+    with open(input_file, 'rb') as infile, open(output_file, 'wb') as outfile:
         for line in infile:
-            if line.strip():
-                data = json.loads(line)
-                problem_id = data.get('id')
+            # Only decode lines that mention one of the requested IDs
+            # (this also skips blank lines without stripping them)
+            if not any(tid in line for tid in target_ids_bytes):
+                continue
+            
+            data = orjson.loads(line)
+            problem_id = data.get('id')
+            
+            if problem_id in target_ids:
+                # Write matching entry to output file as-is
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                outfile.write(line)
+                found_count += 1
+                found_ids.add(problem_id)
+                print(f"✓ Found: {problem_id}")
                 
-                if problem_id in target_ids:
-                    # Write matching entry to output file
-                    json.dump(data, outfile)
-                    outfile.write('\n')
-                    found_count += 1
-                    found_ids.add(problem_id)
-                    print(f"✓ Found: {problem_id}")
+                # Nothing left to look for in the rest of the file
+                if len(found_ids) == len(target_ids):
+                    break
     
     print(f"\n{'='*60}")
     print(f"Results:")
@@ -2,62 +2,127 @@
 """
 Script to find missing problems in final_llm_nonagentic directory
 compared to the dataset.jsonl file.
+Usage: python find_missing_problems.py [-d dataset] [-r results_dir] [--layout {nested,flat}] [--count-only]
 """
 
-import json
+import argparse
 import os
-from pathlib import Path
+import re
+
+# Matches the "id" field of a raw JSONL record without decoding the whole line
+ID_RE = re.compile(rb'"id"\s*:\s*"([^"]+)"')
+
+# Marker that starts every problem ID inside a results folder name
+PROBLEM_ID_MARKER = 'cvdp_copilot_'
+
+# Problem folder prefix used by the flat (single-level) results layout
+FLAT_FOLDER_PREFIX = 'work_auto_' + PROBLEM_ID_MARKER
+FLAT_FOLDER_PREFIX_LEN = len(FLAT_FOLDER_PREFIX)
+
+# Read size used when counting records
+COUNT_CHUNK_SIZE = 1 << 20
+
+def count_dataset_records(dataset_path):
+    """Count records in the dataset JSONL file without decoding them."""
+    count = 0
+    last_chunk = b''
+    with open(dataset_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COUNT_CHUNK_SIZE), b''):
+            count += chunk.count(b'\n')
+            last_chunk = chunk
+    # A final record without a trailing newline still counts
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        count += 1
+    return count
 
 def get_dataset_problem_ids(dataset_path):
     """Extract all problem IDs from the dataset JSONL file."""
-    problem_ids = []
-    with open(dataset_path, 'r') as f:
+    problem_ids = set()
+    with open(dataset_path, 'rb') as f:
         for line in f:
-            if line.strip():
-                data = json.loads(line)
-                problem_ids.append(data['id'])
+            # Blank lines simply don't match, so no strip is needed
+            match = ID_RE.search(line)
+            if match:
+                problem_ids.add(match.group(1).decode())
     return problem_ids
 
-def get_processed_problem_ids(results_dir):
+def _scan_nested(root):
+    """Yield problem IDs from cvdp_copilot_* folders anywhere below root.
+
+    Handles nested run_* directories; matching folders are not descended into.
+    """
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            # Extract the problem ID part (everything after the last marker)
+            _, sep, problem_id_suffix = entry.name.rpartition(PROBLEM_ID_MARKER)
+            if sep:
+                yield PROBLEM_ID_MARKER + problem_id_suffix
+            else:
+                yield from _scan_nested(entry.path)
+
+def _scan_flat(root):
+    """Yield problem IDs from work_auto_cvdp_copilot_* folders directly inside root."""
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.startswith(FLAT_FOLDER_PREFIX) and entry.is_dir(follow_symlinks=False):
+                yield PROBLEM_ID_MARKER + entry.name[FLAT_FOLDER_PREFIX_LEN:]
+
+SCANNERS = {
+    'nested': _scan_nested,
+    'flat': _scan_flat,
+}
+
+def get_processed_problem_ids(results_dir, layout='nested'):
     """Extract all problem IDs from folder names in results directory."""
-    processed_ids = []
     if not os.path.exists(results_dir):
         print(f"Directory {results_dir} does not exist!")
-        return processed_ids
-    
-    # Recursively search for problem folders (handles nested run_* directories)
-    for root, dirs, files in os.walk(results_dir):
-        for folder in dirs:
-            # Look for folders that contain cvdp_copilot pattern
-            if 'cvdp_copilot_' in folder:
-                # Extract the problem ID part
-                parts = folder.split('cvdp_copilot_')
-                if len(parts) >= 2:
-                    problem_id_suffix = parts[-1]
-                    problem_id = f'cvdp_copilot_{problem_id_suffix}'
-                    if problem_id not in processed_ids:
-                        processed_ids.append(problem_id)
+        return set()
     
-    return processed_ids
+    return set(SCANNERS[layout](results_dir))
 
 def main():
-    dataset_file = 'dataset/cvdp_v1.0.2_nonagentic_code_generation_no_commercial.jsonl'
-    results_dir = 'gpt_4o_mini_agent_nonagentic'
+    parser = argparse.ArgumentParser(
+        description='Find dataset problems that have no folder in a results directory'
+    )
+    parser.add_argument('-d', '--dataset',
+                        default='dataset/cvdp_v1.0.2_nonagentic_code_generation_no_commercial.jsonl',
+                        help='Dataset JSONL file')
+    parser.add_argument('-r', '--results-dir',
+                        default='gpt_4o_mini_agent_nonagentic',
+                        help='Results directory to scan')
+    parser.add_argument('--layout',
+                        choices=sorted(SCANNERS),
+                        default='nested',
+                        help='nested: search run_* subdirectories recursively; '
+                             'flat: only work_auto_cvdp_copilot_* folders directly in the results directory '
+                             '(default: nested)')
+    parser.add_argument('--count-only',
+                        action='store_true',
+                        help='Only print the number of records in the dataset')
+    
+    args = parser.parse_args()
+    
+    if args.count_only:
+        print(f"Total records in dataset: {count_dataset_records(args.dataset)}")
+        return
     
     print("Reading dataset...")
-    dataset_ids = get_dataset_problem_ids(dataset_file)
+    dataset_ids = get_dataset_problem_ids(args.dataset)
     print(f"Total problems in dataset: {len(dataset_ids)}")
     
     print("\nScanning results directory...")
-    processed_ids = get_processed_problem_ids(results_dir)
+    processed_ids = get_processed_problem_ids(args.results_dir, args.layout)
     print(f"Total processed problems: {len(processed_ids)}")
     
     # Find missing problems
-    dataset_set = set(dataset_ids)
-    processed_set = set(processed_ids)
-    
-    missing = dataset_set - processed_set
-    extra = processed_set - dataset_set
+    missing = dataset_ids - processed_ids
+    extra = processed_ids - dataset_ids
     
     print(f"\n{'='*60}")
     print(f"Missing problems: {len(missing)}")
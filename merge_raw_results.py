@@ -3,17 +3,27 @@
 Simple script to merge individual raw_result.json files and generate a complete report.
 """
 
-import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 import os
+import orjson
 
 # Add parent directory to path to import Report
 sys.path.insert(0, str(Path(__file__).parent))
 from src.report import Report
 
+# Number of raw_result.json files read concurrently
+LOAD_WORKERS = 16
 
-def merge_raw_results(base_dir):
+
+def load_raw_result(path):
+    """Load a single raw_result.json file."""
+    return orjson.loads(path.read_bytes())
+
+
+def merge_raw_results(base_dir, pretty=False):
     """Collect all individual raw_result.json files and create a consolidated report."""
     base_path = Path(base_dir)
     
@@ -24,23 +34,29 @@ def merge_raw_results(base_dir):
     
     print(f"Found {len(problem_folders)} problem folders")
     
+    raw_result_paths = []
     for folder in problem_folders:
         raw_result_path = folder / 'raw_result.json'
         if raw_result_path.exists():
-            with open(raw_result_path, 'r') as f:
-                result = json.load(f)
-                # Merge the dictionary (each file has one problem ID as key)
-                raw_logs.update(result)
-                # Get the problem ID from the result
-                problem_id = list(result.keys())[0]
-                print(f"  ✓ {problem_id}")
+            raw_result_paths.append(raw_result_path)
         else:
             print(f"  ✗ Missing: {folder.name}")
     
+    # Overlap the many small file reads; merging stays on the main thread
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        for result in executor.map(load_raw_result, raw_result_paths):
+            # Merge the dictionary (each file has one problem ID as key)
+            raw_logs.update(result)
+            # Get the problem ID from the result
+            problem_id = next(iter(result))
+            print(f"  ✓ {problem_id}")
+    
     # Write consolidated raw_result.json
     output_path = base_path / 'raw_result.json'
-    with open(output_path, 'w') as f:
-        json.dump(raw_logs, f, indent=2)
+    option = orjson.OPT_APPEND_NEWLINE
+    if pretty:
+        option |= orjson.OPT_INDENT_2
+    output_path.write_bytes(orjson.dumps(raw_logs, option=option))
     
     print(f"\n✓ Created {output_path} with {len(raw_logs)} problems")
     
@@ -54,8 +70,13 @@ def merge_raw_results(base_dir):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python merge_raw_results.py <directory>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Merge individual raw_result.json files and generate a complete report'
+    )
+    parser.add_argument('directory', help='Directory containing work_auto_cvdp_* problem folders')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Indent the merged raw_result.json for readability')
+    
+    args = parser.parse_args()
     
-    merge_raw_results(sys.argv[1])
+    merge_raw_results(args.directory, pretty=args.pretty)
@@ -6,59 +6,118 @@ Usage: python run_all_problems.py [options]
 """
 
 import sys
-import json
 import os
 import subprocess
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import lru_cache
 from pathlib import Path
 import time
-import shutil
+import orjson
 
+from find_missing_problems import count_dataset_records
 
-def read_dataset(dataset_file):
-    """Read all problems from the dataset JSONL file."""
-    problems = []
+
+# Pause before starting a benchmark while the load average exceeds the CPU count
+LOAD_BACKOFF_SECONDS = 0.2
+
+# One-line outcome printed per problem in parallel runs, first matching stat wins
+OUTCOME_LABELS = [
+    ('dataset_created', 'FAILED - enhanced entry created'),
+    ('dataset_failed', 'FAILED - enhanced entry creation failed'),
+    ('passed', 'PASSED'),
+    ('benchmark_failed', 'benchmark failed'),
+    ('skipped', 'skipped'),
+]
+
+
+def read_dataset(dataset_file, start_from=0, limit=None):
+    """Yield problems from the dataset JSONL file, honouring start index and limit."""
     if not os.path.exists(dataset_file):
         print(f"Error: Dataset file not found at {dataset_file}")
         sys.exit(1)
-    cnt = 0
-    with open(dataset_file, 'r') as f:
+    idx = 0
+    yielded = 0
+    with open(dataset_file, 'rb') as f:
         for line in f:
+            if limit is not None and yielded >= limit:
+                break
             try:
-                data = json.loads(line.strip())
-                problems.append(data)
-            except json.JSONDecodeError as e:
+                data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
                 print(f"Warning: Skipping invalid JSON line: {e}")
                 continue
-    
-    return problems
+            idx += 1
+            if idx <= start_from:
+                continue
+            yielded += 1
+            yield data
+
 
+def run_command(cmd, description, quiet=True, log_file=None):
+    """Run a shell command and handle errors.
 
-def run_command(cmd, description):
-    """Run a shell command and handle errors."""
-    print(f"\n{'='*80}")
-    print(f"Running: {description}")
-    print(f"Command: {' '.join(cmd)}")
-    print(f"{'='*80}")
+    When quiet, the banner is skipped and the command is only echoed if it fails.
+    With a log_file, the command's stdout and stderr go there instead of the console.
+    """
+    if not quiet:
+        print(f"\n{'='*80}")
+        print(f"Running: {description}")
+        print(f"Command: {' '.join(cmd)}")
+        print(f"{'='*80}")
+    
+    # Flush our own output so it stays ahead of the command's
+    sys.stdout.flush()
     
     try:
-        result = subprocess.run(
+        # Stream the command's stdout/stderr straight through instead of buffering it.
+        # Python's own descriptors are non-inheritable already, so close_fds=False is
+        # safe and lets CPython launch via posix_spawn rather than fork + exec.
+        subprocess.run(
             cmd,
             check=True,
-            capture_output=True,
-            text=True
+            close_fds=False,
+            stdout=log_file,
+            stderr=subprocess.STDOUT if log_file else None
         )
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
         return True
     except subprocess.CalledProcessError as e:
+        if quiet:
+            print(f"Error: {description} failed")
+            print(f"Command: {' '.join(cmd)}")
         print(f"Error: Command failed with exit code {e.returncode}")
-        print(f"STDOUT: {e.stdout}")
-        print(f"STDERR: {e.stderr}")
         return False
 
 
+@lru_cache(maxsize=4096)
+def _report_passed(report_path, mtime_ns, size):
+    """Decide whether a report.json records a pass.
+
+    Only the verdict is cached, not the parsed report; mtime and size key the
+    cache so a rewritten report is evaluated again.
+    """
+    report = orjson.loads(Path(report_path).read_bytes())
+    
+    # Check root-level report format first (most reliable)
+    if 'test_details' in report:
+        failing_tests = report.get('test_details', {}).get('failing_tests', [])
+        passing_tests = report.get('test_details', {}).get('passing_tests', [])
+        return len(failing_tests) == 0 and len(passing_tests) > 0
+    # Check if test passed - looking for pass rate or status
+    if 'pass_rate' in report:
+        return float(report.get('pass_rate', 0)) >= 100.0
+    if 'status' in report:
+        return report.get('status') == 'passed'
+    if 'test_pass_rate' in report:
+        return float(report.get('test_pass_rate', 0)) >= 100.0
+    # Try to infer from test counts
+    total = report.get('total_tests', 0)
+    passed_tests = report.get('passed_tests', 0)
+    return total > 0 and passed_tests == total
+
+
 def check_problem_passed(work_dir, problem_name):
     """Check if a problem passed by reading the report.json file."""
     # Try root-level report.json first (this has the aggregated results)
@@ -73,28 +132,8 @@ def check_problem_passed(work_dir, problem_name):
         return False
     
     try:
-        with open(report_path, 'r') as f:
-            report = json.load(f)
-        
-        # Check root-level report format first (most reliable)
-        if 'test_details' in report:
-            failing_tests = report.get('test_details', {}).get('failing_tests', [])
-            passing_tests = report.get('test_details', {}).get('passing_tests', [])
-            passed = len(failing_tests) == 0 and len(passing_tests) > 0
-        # Check if test passed - looking for pass rate or status
-        elif 'pass_rate' in report:
-            pass_rate = float(report.get('pass_rate', 0))
-            passed = pass_rate >= 100.0
-        elif 'status' in report:
-            passed = report.get('status') == 'passed'
-        elif 'test_pass_rate' in report:
-            test_pass_rate = float(report.get('test_pass_rate', 0))
-            passed = test_pass_rate >= 100.0
-        else:
-            # Try to infer from test counts
-            total = report.get('total_tests', 0)
-            passed_tests = report.get('passed_tests', 0)
-            passed = (total > 0 and passed_tests == total)
+        st = os.stat(report_path)
+        passed = _report_passed(report_path, st.st_mtime_ns, st.st_size)
         
         if passed:
             print(f"✓ Problem PASSED - will skip enhancement")
@@ -113,7 +152,8 @@ def cleanup_work_directory(work_dir):
     if os.path.exists(work_dir):
         try:
             print(f"Cleaning up work directory: {work_dir}")
-            shutil.rmtree(work_dir)
+            # coreutils rm removes large artifact trees much faster than shutil.rmtree
+            subprocess.run(['rm', '-rf', '--', work_dir], check=True)
             print(f"✓ Deleted {work_dir}")
             return True
         except Exception as e:
@@ -124,10 +164,188 @@ def cleanup_work_directory(work_dir):
 
 def get_next_run_number():
     """Find the next available run number by checking existing run_* directories."""
-    run_num = 1
-    while os.path.exists(f"run_{run_num}"):
-        run_num += 1
-    return run_num
+    # One directory listing instead of an exists() probe per candidate number
+    with os.scandir('.') as entries:
+        run_nums = [
+            int(entry.name[4:]) for entry in entries
+            if entry.name.startswith('run_') and entry.name[4:].isdigit()
+        ]
+    return max(run_nums) + 1 if run_nums else 1
+
+
+def get_entry_path(run_dir, problem_id):
+    """Path of the enhanced dataset entry file written for one problem."""
+    return os.path.join(run_dir, "entries", f"{problem_id}.jsonl")
+
+
+def get_log_path(run_dir, problem_id):
+    """Path of the log file holding one problem's output in parallel runs."""
+    return os.path.join(run_dir, "logs", f"{problem_id}.log")
+
+
+def describe_outcome(problem_stats):
+    """Summarise a problem's statistics as a short outcome label."""
+    for key, label in OUTCOME_LABELS:
+        if problem_stats[key]:
+            return label
+    return 'unknown'
+
+
+def existing_entry_paths(run_dir, problem_ids):
+    """Entry file paths of the given problems that exist, in the given order."""
+    entry_paths = (get_entry_path(run_dir, problem_id) for problem_id in problem_ids)
+    return [path for path in entry_paths if os.path.exists(path)]
+
+
+def append_entries(output_file, entry_paths):
+    """Append per-problem entry files to the output file in order, then delete them."""
+    if not entry_paths:
+        return
+    
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    # sendfile() copies in-kernel but rejects O_APPEND targets, so seek to the end instead
+    out_fd = os.open(output_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        os.lseek(out_fd, 0, os.SEEK_END)
+        for entry_path in entry_paths:
+            in_fd = os.open(entry_path, os.O_RDONLY)
+            try:
+                size = os.fstat(in_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            finally:
+                os.close(in_fd)
+            os.remove(entry_path)
+    finally:
+        os.close(out_fd)
+
+
+def process_problem(job):
+    """Benchmark one problem and add it to the enhanced dataset if it failed.
+
+    In parallel runs all of the problem's output, including that of the
+    commands it runs, goes to its own log file so problems don't interleave.
+    Returns a Counter of the statistics this problem contributed.
+    """
+    idx, total, problem_id, run_dir, args = job
+    
+    if args.jobs <= 1:
+        return _process_problem(idx, total, problem_id, run_dir, args, None)
+    
+    log_path = get_log_path(run_dir, problem_id)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'a') as log_file, redirect_stdout(log_file):
+        return _process_problem(idx, total, problem_id, run_dir, args, log_file)
+
+
+def _process_problem(idx, total, problem_id, run_dir, args, log_file):
+    """Run the benchmark and dataset steps for one problem, see process_problem."""
+    stats = Counter()
+    
+    print(f"\n{'#'*80}")
+    print(f"# Problem {idx}/{total}: {problem_id}")
+    print(f"{'#'*80}")
+    
+    # Create work directory name inside run directory
+    work_dir = os.path.join(run_dir, f"{args.work_prefix}_{problem_id}")
+    
+    # Extract problem name (remove last 5 characters for directory name)
+    problem_name = problem_id[:-5] if len(problem_id) > 5 else problem_id
+    
+    # Step 1: Run benchmark (unless skipped)
+    if not args.skip_benchmark:
+        # Back off briefly only when the machine is already saturated
+        if os.getloadavg()[0] > (os.cpu_count() or 1):
+            time.sleep(LOAD_BACKOFF_SECONDS)
+        
+        benchmark_cmd = [
+            './run_and_extract_errors.sh',
+            problem_id,
+            work_dir,
+            args.model,
+            args.dataset
+        ]
+        
+        success = run_command(
+            benchmark_cmd,
+            f"Running benchmark for {problem_id}",
+            quiet=not args.verbose,
+            log_file=log_file
+        )
+        
+        if success:
+            stats['benchmark_success'] += 1
+            print(f"✓ Benchmark completed for {problem_id}")
+        else:
+            stats['benchmark_failed'] += 1
+            print(f"✗ Benchmark failed for {problem_id}")
+            
+            # Clean up failed benchmark directory
+            if not args.keep_failed:
+                if cleanup_work_directory(work_dir):
+                    stats['cleaned_up'] += 1
+            
+            print("Skipping dataset creation for this problem")
+            stats['skipped'] += 1
+            return stats
+    else:
+        print(f"Skipping benchmark (--skip-benchmark flag set)")
+        # Check if work directory exists
+        if not os.path.exists(work_dir):
+            print(f"Warning: Work directory {work_dir} does not exist")
+            stats['skipped'] += 1
+            return stats
+    
+    # Step 1.5: Check if problem passed or failed
+    problem_passed = check_problem_passed(work_dir, problem_name)
+    
+    if problem_passed:
+        stats['passed'] += 1
+        print(f"Skipping enhancement - problem passed all tests")
+        return stats
+    else:
+        stats['failed'] += 1
+    
+    # Step 2: Create enhanced dataset entry (only for failed problems).
+    # Each problem writes its own entry file; main() appends it to the output.
+    entry_path = get_entry_path(run_dir, problem_id)
+    if os.path.exists(entry_path):
+        os.remove(entry_path)
+    
+    dataset_cmd = [
+        './create_temp_dataset.py',
+        problem_id,
+        work_dir,
+        entry_path
+    ]
+    
+    success = run_command(
+        dataset_cmd,
+        f"Creating enhanced dataset entry for {problem_id}",
+        quiet=not args.verbose,
+        log_file=log_file
+    )
+    
+    if success:
+        stats['dataset_created'] += 1
+        print(f"✓ Enhanced dataset entry created for {problem_id}")
+        
+        # Clean up work directory after successful dataset creation (for failed tests)
+        if not args.keep_failed:
+            if cleanup_work_directory(work_dir):
+                stats['cleaned_up'] += 1
+    else:
+        stats['dataset_failed'] += 1
+        print(f"✗ Failed to create dataset entry for {problem_id}")
+    
+    return stats
 
 
 def main():
@@ -165,6 +383,13 @@ def main():
     parser.add_argument('--run-dir', 
                         type=str,
                         help='Specify run directory name (default: auto-generate run_N)')
+    parser.add_argument('-v', '--verbose', 
+                        action='store_true',
+                        help='Print a banner with the full command before each step')
+    parser.add_argument('-j', '--jobs', 
+                        type=int,
+                        default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Number of problems to run in parallel (default: half the CPU count)')
     
     args = parser.parse_args()
     
@@ -186,6 +411,9 @@ def main():
     print(f"Model: {args.model}")
     print(f"Output: {args.output}")
     print(f"Work prefix: {args.work_prefix}")
+    print(f"Parallel jobs: {args.jobs}")
+    if args.jobs > 1:
+        print(f"Per-problem logs: {os.path.join(run_dir, 'logs')}")
     print()
     
     # Clear output file if requested
@@ -193,26 +421,24 @@ def main():
         print(f"Clearing output file: {args.output}")
         os.remove(args.output)
     
-    # Read dataset
+    # Read dataset, keeping only the IDs of the selected problems
     print("Reading dataset...")
-    problems = read_dataset(args.dataset)
-    print(f"Found {len(problems)} problems in dataset")
-    
-    # Apply start and limit
     if args.start_from > 0:
-        problems = problems[args.start_from:]
         print(f"Starting from problem index {args.start_from}")
-    
     if args.limit:
-        problems = problems[:args.limit]
         print(f"Limited to {args.limit} problems")
     
-    print(f"Processing {len(problems)} problems")
+    problem_ids = [
+        problem.get('id', 'unknown')
+        for problem in read_dataset(args.dataset, args.start_from, args.limit or None)
+    ]
+    
+    print(f"Processing {len(problem_ids)} problems")
     print()
     
     # Track statistics
-    stats = {
-        'total': len(problems),
+    stats = Counter({
+        'total': len(problem_ids),
         'benchmark_success': 0,
         'benchmark_failed': 0,
         'passed': 0,
@@ -221,97 +447,31 @@ def main():
         'dataset_failed': 0,
         'skipped': 0,
         'cleaned_up': 0
-    }
+    })
     
-    # Process each problem
-    for idx, problem in enumerate(problems, 1):
-        problem_id = problem.get('id', 'unknown')
-        
-        print(f"\n{'#'*80}")
-        print(f"# Problem {idx}/{len(problems)}: {problem_id}")
-        print(f"{'#'*80}")
-        
-        # Create work directory name inside run directory
-        work_dir = os.path.join(run_dir, f"{args.work_prefix}_{problem_id}")
-        
-        # Extract problem name (remove last 5 characters for directory name)
-        problem_name = problem_id[:-5] if len(problem_id) > 5 else problem_id
-        
-        # Step 1: Run benchmark (unless skipped)
-        if not args.skip_benchmark:
-            benchmark_cmd = [
-                './run_and_extract_errors.sh',
-                problem_id,
-                work_dir,
-                args.model,
-                args.dataset
-            ]
-            
-            success = run_command(
-                benchmark_cmd,
-                f"Running benchmark for {problem_id}"
-            )
-            
-            if success:
-                stats['benchmark_success'] += 1
-                print(f"✓ Benchmark completed for {problem_id}")
-            else:
-                stats['benchmark_failed'] += 1
-                print(f"✗ Benchmark failed for {problem_id}")
-                
-                # Clean up failed benchmark directory
-                if not args.keep_failed:
-                    if cleanup_work_directory(work_dir):
-                        stats['cleaned_up'] += 1
-                
-                print("Skipping dataset creation for this problem")
-                stats['skipped'] += 1
-                continue
-        else:
-            print(f"Skipping benchmark (--skip-benchmark flag set)")
-            # Check if work directory exists
-            if not os.path.exists(work_dir):
-                print(f"Warning: Work directory {work_dir} does not exist")
-                stats['skipped'] += 1
-                continue
-        
-        # Step 1.5: Check if problem passed or failed
-        problem_passed = check_problem_passed(work_dir, problem_name)
-        
-        if problem_passed:
-            stats['passed'] += 1
-            print(f"Skipping enhancement - problem passed all tests")
-            continue
-        else:
-            stats['failed'] += 1
-        
-        # Step 2: Create enhanced dataset entry (only for failed problems)
-        dataset_cmd = [
-            './create_temp_dataset.py',
-            problem_id,
-            work_dir,
-            args.output
-        ]
-        
-        success = run_command(
-            dataset_cmd,
-            f"Creating enhanced dataset entry for {problem_id}"
-        )
-        
-        if success:
-            stats['dataset_created'] += 1
-            print(f"✓ Enhanced dataset entry created for {problem_id}")
-            
-            # Clean up work directory after successful dataset creation (for failed tests)
-            if not args.keep_failed:
-                if cleanup_work_directory(work_dir):
-                    stats['cleaned_up'] += 1
+    # Process each problem, in parallel when more than one job is requested
+    total = len(problem_ids)
+    jobs = [(idx, total, problem_id, run_dir, args)
+            for idx, problem_id in enumerate(problem_ids, 1)]
+    # Each problem's entry is appended as soon as its result comes back; map()
+    # yields in submission order, so the output keeps the dataset order
+    try:
+        if args.jobs > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                for (idx, _, problem_id, _, _), problem_stats in zip(
+                        jobs, executor.map(process_problem, jobs, chunksize=1)):
+                    stats.update(problem_stats)
+                    append_entries(args.output, existing_entry_paths(run_dir, [problem_id]))
+                    print(f"[{idx}/{total}] {problem_id}: {describe_outcome(problem_stats)} "
+                          f"(log: {get_log_path(run_dir, problem_id)})")
         else:
-            stats['dataset_failed'] += 1
-            print(f"✗ Failed to create dataset entry for {problem_id}")
-        
-        # Small delay to avoid overwhelming the system
-        time.sleep(1)
+            for job in jobs:
+                stats.update(process_problem(job))
+                append_entries(args.output, existing_entry_paths(run_dir, [job[2]]))
+    finally:
+        # If the run stopped early, keep the entries of problems that finished
+        # but whose results were not reached yet
+        append_entries(args.output, existing_entry_paths(run_dir, problem_ids))
     
     # Print final statistics
     print("\n" + "="*80)
@@ -335,8 +495,7 @@ def main():
     
     # Count lines in output file
     if os.path.exists(args.output):
-        with open(args.output, 'r') as f:
-            line_count = sum(1 for _ in f)
+        line_count = count_dataset_records(args.output)
         print(f"Total entries in dataset: {line_count}")
     
     print("="*80)
@@ -4,11 +4,131 @@ Extract HDL/Hardware errors and Python tracebacks from log files
 Extracts Verilog compilation, simulation, linker errors, and Python tracebacks
 """
 
+import os
 import sys
 import re
+import mmap
+from contextlib import nullcontext
 from pathlib import Path
 
 
+# Marker that opens a Python traceback; lines containing the marker (with or
+# without the colon) are never reported as HDL errors
+TRACEBACK_MARKER = b'Traceback (most recent call last)'
+
+# A Python traceback: the line holding the header, then every following line that
+# is indented by two spaces or is an exception line ("ValueError: ...").  The
+# body is captured inside a lookahead and matched again through the backreference,
+# which makes it atomic (a possessive repeat needs Python 3.11); together with
+# the final lookahead this drops a traceback that runs straight into another
+# header, which replaces it.
+TRACEBACK_RE = re.compile(
+    rb'(?m)^[^\n]*Traceback \(most recent call last\):[^\n]*'
+    rb'(?=((?:\n(?![^\n]*Traceback \(most recent call last\):)'
+    rb'(?:  |[ \t\r\x0b\x0c]*\w+(?:Error|Exception):)[^\n]*)*))\1'
+    rb'(?=\n(?![^\n]*Traceback \(most recent call last\):)|\Z)'
+)
+
+# Pytest exception lines, e.g. "E   ValueError: ..."
+PYTEST_ERROR_RE = re.compile(rb'^E\s+(\w+)(Error|Exception):')
+
+# Traceback frame lines, e.g. '  File "/src/test.py", line 10'
+FILE_LINE_RE = re.compile(rb'\s+File "/')
+
+# HDL error patterns in priority order:
+# (pattern, context lines before, context lines after, substring that vetoes the match)
+HDL_ERROR_PATTERNS = [
+    # Verilog/SystemVerilog compilation errors
+    (rb'syntax error|parse error|compilation error', 2, 3, None),
+    # Verilog simulator errors (iverilog, verilator, etc.)
+    (rb'(iverilog|verilator|vvp).*error', 1, 3, None),
+    # Undeclared/undefined identifiers
+    (rb'undeclared|undefined|not declared|unknown identifier', 1, 2, None),
+    # Type mismatch, width mismatch
+    (rb'type mismatch|width mismatch|incompatible|illegal', 1, 2, None),
+    # Linker errors
+    (rb'undefined reference|linker error|ld:|link error', 1, 2, None),
+    # Assertion failures (SystemVerilog/simulation)
+    (rb'assertion failed|assert.*failed|\$fatal|\$error', 1, 2, b'File "/src'),
+    # Segmentation fault
+    (rb'segmentation fault|segfault|core dumped|signal 11', 2, 3, None),
+    # Module/port errors
+    (rb'module.*not found|port.*not found|missing port|unresolved', 1, 2, None),
+    # File not found (for includes, etc.)
+    (rb'(cannot open|file not found|no such file).*\.(v|sv|vh|svh)', 0, 1, None),
+    # Simulation runtime errors (X propagation, etc.)
+    (rb'unknown value|value is x|value is z|tri-state', 0, 1, b'Cannot convert Logic'),
+]
+HDL_ERROR_PATTERNS = [
+    (re.compile(pattern, re.IGNORECASE), before, after, excluded)
+    for pattern, before, after, excluded in HDL_ERROR_PATTERNS
+]
+
+# Any line worth a closer look: exception lines or one of the HDL patterns
+CANDIDATE_RE = re.compile(
+    rb'(?m)CalledProcessError:|^E\s|(?i:' +
+    b'|'.join(b'(?:' + pattern.pattern + b')' for pattern, _, _, _ in HDL_ERROR_PATTERNS) +
+    b')'
+)
+
+
+def _normalize_newlines(mm):
+    """Return the log with CRLF and lone CR line endings turned into LF.
+
+    Text-mode reading treated all three as line boundaries, so progress output
+    that redraws with a bare CR splits into separate lines.  The mapping is
+    scanned directly when it holds no CR at all, which avoids the copy.
+    """
+    if mm.find(b'\r') == -1:
+        return mm
+    return mm[:].replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+
+def _decode_line(raw):
+    """Decode one raw log line for output."""
+    return raw.decode('utf-8', errors='ignore').rstrip()
+
+
+def _next_line(mm, end):
+    """Return (start, end) of the line after the one ending at end, or None at EOF."""
+    if end >= len(mm):
+        return None
+    start = end + 1
+    next_end = mm.find(b'\n', start)
+    return start, (len(mm) if next_end == -1 else next_end)
+
+
+def _line_bounds(mm, pos):
+    """Return (start, end) of the line containing pos, excluding the newline."""
+    start = mm.rfind(b'\n', 0, pos) + 1
+    end = mm.find(b'\n', pos)
+    return start, (len(mm) if end == -1 else end)
+
+
+def _context_block(mm, start, end, before, after):
+    """Return the non-blank lines from `before` lines above the line at [start, end)
+    up to (not including) `after` lines from it."""
+    raw_lines = [mm[start:end]]
+    
+    line_start = start
+    for _ in range(before):
+        if line_start == 0:
+            break
+        prev_start = mm.rfind(b'\n', 0, line_start - 1) + 1
+        raw_lines.insert(0, mm[prev_start:line_start - 1])
+        line_start = prev_start
+    
+    line_end = end
+    for _ in range(after - 1):
+        bounds = _next_line(mm, line_end)
+        if bounds is None:
+            break
+        raw_lines.append(mm[bounds[0]:bounds[1]])
+        line_end = bounds[1]
+    
+    return [_decode_line(raw) for raw in raw_lines if raw.strip()]
+
+
 def extract_hdl_errors(log_file):
     """Extract Verilog/SystemVerilog compilation, simulation errors, and Python tracebacks"""
     
@@ -16,167 +136,68 @@ def extract_hdl_errors(log_file):
         print(f"Error: File not found: {log_file}")
         sys.exit(1)
     
-    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
-    
-    error_blocks = []
-    
-    # Extract Python tracebacks first
-    in_traceback = False
-    current_traceback = []
-    
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # Start of traceback
-        if 'Traceback (most recent call last):' in line:
-            in_traceback = True
-            current_traceback = [line.rstrip()]
-            continue
-        
-        # Inside traceback - collect indented lines and error lines
-        if in_traceback:
-            if line.startswith('                                                        ') or \
-               line.startswith('  ') or \
-               re.match(r'\w+(Error|Exception):', stripped):
-                current_traceback.append(line.rstrip())
-            else:
-                # End of traceback block
-                if current_traceback:
-                    error_blocks.append(current_traceback)
-                    current_traceback = []
-                in_traceback = False
-    
-    # Add last traceback if exists
-    if current_traceback:
-        error_blocks.append(current_traceback)
+    # Blocks are collected per kind, then reported in the order
+    # tracebacks, exceptions, HDL errors
+    traceback_blocks = []
+    exception_blocks = []
+    hdl_blocks = []
     
-    # Extract CalledProcessError and other exceptions (without full traceback)
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # CalledProcessError from subprocess
-        if 'CalledProcessError:' in line or 'subprocess.CalledProcessError:' in line:
-            # Get context around the error
-            start = max(0, i-3)
-            end = min(len(lines), i+1)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Generic exception lines (Error/Exception at start of line after E marker)
-        if re.match(r'^E\s+(\w+)(Error|Exception):', line):
-            start = max(0, i-2)
-            end = min(len(lines), i+1)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
+    # Scan the mapped log as raw bytes; only reported lines are ever decoded
+    with open(log_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        with (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else nullcontext(b'')) as mapped:
+            mm = _normalize_newlines(mapped)
+            traceback_blocks = [
+                [_decode_line(raw) for raw in match.group(0).split(b'\n')]
+                for match in TRACEBACK_RE.finditer(mm)
+            ]
+            
+            pos = 0
+            while True:
+                match = CANDIDATE_RE.search(mm, pos)
+                if not match:
+                    break
+                start, end = _line_bounds(mm, match.start())
+                line = mm[start:end]
+                pos = end + 1
+                
+                # CalledProcessError from subprocess
+                if b'CalledProcessError:' in line:
+                    # Get context around the error
+                    exception_blocks.append(_context_block(mm, start, end, 3, 1))
+                # Generic exception lines (Error/Exception at start of line after E marker)
+                elif line.startswith(b'E') and (b'Error:' in line or b'Exception:' in line) and \
+                     PYTEST_ERROR_RE.match(line):
+                    exception_blocks.append(_context_block(mm, start, end, 2, 1))
+                
+                # HDL errors: skip lines that are part of Python tracebacks (captured above)
+                if TRACEBACK_MARKER in line or FILE_LINE_RE.match(line):
+                    continue
+                
+                # First matching pattern wins, in priority order
+                for pattern, before, after, excluded in HDL_ERROR_PATTERNS:
+                    if pattern.search(line) and not (excluded and excluded in line):
+                        hdl_blocks.append(_context_block(mm, start, end, before, after))
+                        break
     
-    # Now extract HDL errors
-    for i, line in enumerate(lines):
-        stripped = line.strip()
-        
-        # Skip lines that are part of Python tracebacks (already captured)
-        if 'Traceback (most recent call last)' in line or \
-           re.match(r'\s+File "/', line):
-            continue
-        
-        # Verilog/SystemVerilog compilation errors
-        # Patterns: "Error:", "error:", "ERROR:", syntax errors, etc.
-        if re.search(r'(syntax error|parse error|compilation error)', line, re.IGNORECASE):
-            start = max(0, i-2)
-            end = min(len(lines), i+3)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Verilog simulator errors (iverilog, verilator, etc.)
-        if re.search(r'(iverilog|verilator|vvp).*error', line, re.IGNORECASE):
-            start = max(0, i-1)
-            end = min(len(lines), i+3)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Undeclared/undefined identifiers
-        if re.search(r'(undeclared|undefined|not declared|unknown identifier)', line, re.IGNORECASE):
-            start = max(0, i-1)
-            end = min(len(lines), i+2)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Type mismatch, width mismatch
-        if re.search(r'(type mismatch|width mismatch|incompatible|illegal)', line, re.IGNORECASE):
-            start = max(0, i-1)
-            end = min(len(lines), i+2)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Linker errors
-        if re.search(r'(undefined reference|linker error|ld:|link error)', line, re.IGNORECASE):
-            start = max(0, i-1)
-            end = min(len(lines), i+2)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Assertion failures (SystemVerilog/simulation)
-        if re.search(r'(assertion failed|assert.*failed|\$fatal|\$error)', line, re.IGNORECASE) and \
-           not 'File "/src' in line:
-            start = max(0, i-1)
-            end = min(len(lines), i+2)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Segmentation fault
-        if re.search(r'(segmentation fault|segfault|core dumped|signal 11)', line, re.IGNORECASE):
-            start = max(0, i-2)
-            end = min(len(lines), i+3)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # Module/port errors
-        if re.search(r'(module.*not found|port.*not found|missing port|unresolved)', line, re.IGNORECASE):
-            start = max(0, i-1)
-            end = min(len(lines), i+2)
-            block = [lines[j].rstrip() for j in range(start, end) if lines[j].strip()]
-            error_blocks.append(block)
-            continue
-        
-        # File not found (for includes, etc.)
-        if re.search(r'(cannot open|file not found|no such file).*\.(v|sv|vh|svh)', line, re.IGNORECASE):
-            block = [line.rstrip()]
-            error_blocks.append(block)
-            continue
-        
-        # Simulation runtime errors (X propagation, etc.)
-        if re.search(r'(unknown value|value is x|value is z|tri-state)', line, re.IGNORECASE) and \
-           not 'Cannot convert Logic' in line:
-            block = [line.rstrip()]
-            error_blocks.append(block)
-            continue
+    error_blocks = traceback_blocks + exception_blocks + hdl_blocks
     
     # Remove duplicates while preserving order
     seen = set()
     unique_blocks = []
     for block in error_blocks:
-        block_str = '\n'.join(block)
-        if block_str not in seen and block:
-            seen.add(block_str)
+        # A tuple shares the block's line strings, so no joined copy is built
+        key = tuple(block)
+        if key not in seen and block:
+            seen.add(key)
             unique_blocks.append(block)
     
     # Print all error blocks
     if not unique_blocks:
         print("No errors found in the log file.")
     else:
-        for block in unique_blocks:
-            for line in block:
-                print(line)
-            print()  # Blank line between blocks
+        # Emit everything in one write; each block is followed by a blank line
+        sys.stdout.write(''.join('\n'.join(block) + '\n\n' for block in unique_blocks))
 
 
 def main():